@@ -1,7 +1,39 @@
+import functools
+
 import taichi as ti
 import numpy as np
 
-MAX_ORDER = 10 # <= order_u, order_v
+from .b_spline_surface_numba import HAS_NUMBA, evaluate_surface_numba
+
+
+@functools.lru_cache(maxsize=None)
+def _make_faces(res_u: int, res_v: int, is_cylinder: bool,
+                num_U_knot: int, order_u: int, num_u: int) -> np.ndarray:
+    """Flattened triangle indices for a res_u x res_v sample grid. The
+    topology only depends on the arguments, so the result is cached and
+    shared between surfaces with the same resolution."""
+    if is_cylinder:
+        first_range = int(round(((order_u - 1) / (num_U_knot - 1)) * res_u)) - 1
+        last_range = int(round(((num_u + order_u - 2) / (num_U_knot - 1)) * res_u))
+        # print(first_range, last_range)
+    else:
+        first_range = 0
+        last_range = res_u - 1
+
+    # Vertex indices in the flattened 1D array, two triangles per quad
+    i, j = np.meshgrid(np.arange(first_range, last_range),
+                       np.arange(res_v - 1), indexing='ij')
+    i_next = (i + 1) % res_u
+    v0 = i * res_v + j
+    v1 = i_next * res_v + j
+    v2 = i_next * res_v + (j + 1)
+    v3 = i * res_v + (j + 1)
+
+    faces = np.stack([v0, v1, v2, v0, v2, v3], axis=-1)
+    faces = faces.astype(np.int32).reshape(-1)  # Flattened
+    faces.setflags(write=False)
+    return faces
+
 
 @ti.data_oriented
 class BSplineSurface:
@@ -11,15 +43,29 @@ class BSplineSurface:
                  num_u: int, num_v: int,
                  res_u: int, res_v: int,
                  order_u: int = 5, order_v: int = 5,
-                 is_cylinder=False):
+                 is_cylinder=False, dtype=ti.f32, engine='taichi'):
         """
           - control_vertices: numpy array, shape=(num_vertices, 3)
           - uv_mapping: numpy array, shape=(num_vertices, 2) (u,v) value of each control point
           - num_u, num_v: the grid size of u, v (num_vertices == num_u*num_v)
           - res_u, res_v: resolution of postprocessed surface
           - order_u, order_v: B-spline order (Cubic = 4, Quadratic = 3, ...)
+          - dtype: storage type of the control net and surface points
+                   (ti.f32 default; ti.f16 halves the bandwidth of the
+                   memory-bound evaluation, blending still accumulates in f32)
+          - engine: 'taichi' (default) or 'numba' — the numba path evaluates
+                    on the CPU via b_spline_surface_numba (plain NumPy when
+                    numba is not installed)
         """
-        self.control_vertices_init = control_vertices
+        # Quantized snapshot of the initial control vertices for reset():
+        # uint8 against the per-axis bounding box instead of an f32 copy
+        # (3 bytes per vertex instead of 12, and it cannot be corrupted by
+        # callers mutating the array they passed in).
+        self._init_min = control_vertices.min(axis=0).astype(np.float32)
+        extent = control_vertices.max(axis=0).astype(np.float32) - self._init_min
+        self._init_scale = np.where(extent > 0.0, extent, 1.0) / 255.0
+        self._init_q8 = np.rint(
+            (control_vertices - self._init_min) / self._init_scale).astype(np.uint8)
         self.control_vertices = control_vertices
         self.uv_mapping = uv_mapping
         self.num_u = num_u
@@ -29,21 +75,50 @@ class BSplineSurface:
         self.order_u = order_u
         self.order_v = order_v
         self.is_cylinder = is_cylinder
+        self.dtype = dtype
+        if engine not in ('taichi', 'numba'):
+            raise ValueError(f"Unknown engine: {engine}")
+        self.engine = engine
+        self._net_buf = None
+        self._out_buf = None
 
         self.num_control_vertices = control_vertices.shape[0]
         self.m_u = num_u - 1
         self.m_v = num_v - 1
 
         print("[B-spline] Initializing B-spline Surface...")
-        self.control_net_np = None
-        self.control_net_field = None
+        # SoA layout (x/y/z channels) so adjacent surface samples read the same
+        # component with coalesced loads instead of strided 12-byte vec3 lanes.
         if self.is_cylinder:
-            self.control_net_np = np.zeros(shape=((self.num_u + self.order_u - 1) * self.num_v, 3), dtype=np.float32)
-            self.control_net_field = ti.Vector.field(3, dtype=ti.f32, shape=(self.num_u + self.order_u - 1) * self.num_v)
+            self.num_net_rows = self.num_u + self.order_u - 1
         else:
-            self.control_net_np = np.zeros(shape=(self.num_u * self.num_v, 3), dtype=np.float32)
-            self.control_net_field = ti.Vector.field(3, dtype=ti.f32, shape=self.num_u * self.num_v)
-        self.reorder_control_net_np()
+            self.num_net_rows = self.num_u
+        # 2D (row, col) layout: the hot loops index the grid directly and
+        # Taichi lays the rows out for strided 2D access.
+        self.control_net_x = ti.field(dtype=self.dtype, shape=(self.num_net_rows, self.num_v))
+        self.control_net_y = ti.field(dtype=self.dtype, shape=(self.num_net_rows, self.num_v))
+        self.control_net_z = ti.field(dtype=self.dtype, shape=(self.num_net_rows, self.num_v))
+
+        # Precompute the scatter indices (uv grid position of each control
+        # vertex) once; they only depend on the static uv_mapping. The
+        # reordering itself runs device-side, so per-frame updates upload the
+        # raw control vertices once and never round-trip through NumPy.
+        rows = np.rint(self.uv_mapping[:, 0] * (self.num_u - 1)).astype(np.int32)
+        cols = np.rint(self.uv_mapping[:, 1] * (self.num_v - 1)).astype(np.int32)
+        self._rows_np = rows
+        self._cols_np = cols
+        self.net_row_field = ti.field(dtype=ti.i32, shape=self.num_control_vertices)
+        self.net_col_field = ti.field(dtype=ti.i32, shape=self.num_control_vertices)
+        self.net_row_field.from_numpy(rows)
+        self.net_col_field.from_numpy(cols)
+        self.control_vertices_field = ti.Vector.field(3, dtype=ti.f32, shape=self.num_control_vertices)
+
+        # Per-cell dirty flags: a surface sample only depends on its
+        # order_u x order_v support, so samples whose support did not move
+        # since the last evaluation keep their stale (still valid) value.
+        self.dirty_eps = 1e-6
+        self.dirty = ti.field(dtype=ti.u8, shape=(self.num_net_rows, self.num_v))
+        self.dirty.fill(1)
 
         # 2. Generate Knot vector (NumPy)
         if self.is_cylinder:
@@ -65,8 +140,46 @@ class BSplineSurface:
         self.U.from_numpy(self.U_np)
         self.V.from_numpy(self.V_np)
 
+        # Reciprocal knot differences 1/(U[p+r-1]-U[p]) tabulated per (p, r)
+        # so the De Boor inner loop multiplies instead of dividing/branching.
+        self.inv_dU = ti.field(dtype=ti.f32, shape=(self.num_U_knot, self.order_u + 1))
+        self.inv_dV = ti.field(dtype=ti.f32, shape=(self.num_V_knot, self.order_v + 1))
+        self.inv_dU.from_numpy(self.make_inv_knot_diff_np(self.U_np, self.order_u))
+        self.inv_dV.from_numpy(self.make_inv_knot_diff_np(self.V_np, self.order_v))
+
+        # Per-sample spans and basis weights. The sampling grid and knots are
+        # fixed for the lifetime of the surface, so the De Boor basis values
+        # can be tabulated once; each frame is then a weighted tensor-product
+        # sum over the order_u x order_v control-point support.
+        span_u_np, basis_u_np = self.make_basis_table_np(
+            self.U_np, self.order_u, self.res_u, periodic=self.is_cylinder)
+        span_v_np, basis_v_np = self.make_basis_table_np(
+            self.V_np, self.order_v, self.res_v, periodic=False)
+        self.span_u = ti.field(dtype=ti.i32, shape=self.res_u)
+        self.span_v = ti.field(dtype=ti.i32, shape=self.res_v)
+        self.basis_u = ti.field(dtype=ti.f32, shape=(self.res_u, self.order_u))
+        self.basis_v = ti.field(dtype=ti.f32, shape=(self.res_v, self.order_v))
+        self.span_u.from_numpy(span_u_np)
+        self.span_v.from_numpy(span_v_np)
+        self.basis_u.from_numpy(basis_u_np)
+        self.basis_v.from_numpy(basis_v_np)
+
+        # Dense basis matrices for the NumPy fallback (numba not installed):
+        # scatter the per-sample support weights into (res, num_rows) so the
+        # whole frame collapses to one einsum contraction instead of an
+        # interpreted De Boor loop per sample.
+        if self.engine == 'numba' and not HAS_NUMBA:
+            self._Nu_dense = np.zeros((self.res_u, self.num_net_rows), dtype=np.float32)
+            self._Nv_dense = np.zeros((self.res_v, self.num_v), dtype=np.float32)
+            sample_u = np.arange(self.res_u)
+            sample_v = np.arange(self.res_v)
+            for a in range(self.order_u):
+                self._Nu_dense[sample_u, span_u_np - a] += basis_u_np[:, a]
+            for b in range(self.order_v):
+                self._Nv_dense[sample_v, span_v_np - b] += basis_v_np[:, b]
+
         # 4. Evaluate surface
-        self.surface_points_field = ti.Vector.field(3, dtype=ti.f32, shape=(self.res_u * self.res_v))
+        self.surface_points_field = ti.Vector.field(3, dtype=self.dtype, shape=(self.res_u * self.res_v))
         self.evaluate_surface_wrapper(self.control_vertices)
 
         print("[B-spline] Initialization Done.\n")
@@ -74,123 +187,199 @@ class BSplineSurface:
     ###########################################################################
     # Numpy class functions
 
-    def reorder_control_net_np(self):
-        if self.is_cylinder:
-            for i in range(len(self.control_vertices)):
-                u_val, v_val = self.uv_mapping[i]
-                row = int(round(u_val * (self.num_u - 1)))
-                col = int(round(v_val * (self.num_v - 1)))
-                self.control_net_np[row * self.num_v + col, :] = self.control_vertices[i]
-                # print(f"{row} * {self.num_v} + {col} = {row * self.num_v + col}")
-            # print("1-------")
-            # Copy points with u=0 from the points with u=1 (original)
-            for i in range(self.num_v):
-                first_index = 0 * self.num_v + i
-                last_index = (self.num_u - 1) * self.num_v + i
-                self.control_net_np[first_index, :] = self.control_net_np[last_index, :]
-                # print(f"{first_index} <- {self.num_u - 1} * {self.num_v} + {i} = {last_index}")
-            # print("2-------")
-            for i in range(1, self.order_u):
-                for j in range(self.num_v):
-                    src_idx = i * self.num_v + j
-                    dst_idx = (self.num_u - 1 + i) * self.num_v + j
-                    self.control_net_np[dst_idx, :] = self.control_net_np[src_idx, :]
-                    # print(f"{self.num_u - 1 + i} * {self.num_v} + {j} = {dst_idx} <- {src_idx} = {i} * {self.num_v} + {j}")
-
-            # print(self.control_net_np)
-        else:
-            for i in range(len(self.control_vertices)):
-                u_val, v_val = self.uv_mapping[i]
-                row = int(round(u_val * (self.num_u - 1)))
-                col = int(round(v_val * (self.num_v - 1)))
-                self.control_net_np[row * self.num_v + col, :] = self.control_vertices[i]
-
-        self.control_net_field.from_numpy(self.control_net_np)
-
     def make_knot_vector_np(self, n_ctrl: int, order: int, periodic: bool=False) -> np.ndarray:
         if periodic:
             L = n_ctrl + 2 * order - 1
             # print(L)
-            knots = np.zeros(L, dtype=np.float32)
-            knots[0] = 0.0
-            knots[-1] = 1.0
-            for i in range(1, L-1):
-                knots[i] = i / (L-1)
+            knots = (np.arange(L, dtype=np.float32) / (L - 1)).astype(np.float32)
             # print(knots)
             return knots
         else:
             L = n_ctrl + order
             knots = np.zeros(L, dtype=np.float32)
-            knots[:order] = 0.0
             knots[-order:] = 1.0
             if L - 2 * order > 0:
-                for i in range(order, L - order):
-                    knots[i] = (i - order + 1) / (L - 2 * order + 1)
+                mid = np.arange(order, L - order, dtype=np.float32)
+                knots[order:L - order] = (mid - order + 1) / (L - 2 * order + 1)
         return knots
 
+    def make_inv_knot_diff_np(self, knots: np.ndarray, order: int) -> np.ndarray:
+        L = len(knots)
+        inv = np.zeros((L, order + 1), dtype=np.float32)
+        for r in range(2, order + 1):
+            diff = knots[r - 1:] - knots[:L - r + 1]
+            inv[:L - r + 1, r] = np.where(diff > 1e-6, 1.0 / np.maximum(diff, 1e-30), 0.0)
+        return inv
+
+    def make_basis_table_np(self, knots: np.ndarray, order: int, res: int,
+                            periodic: bool = False):
+        """Tabulate the span index and the order basis weights for each of the
+        res uniformly spaced samples. Weights are obtained by running the same
+        De Boor recursion as de_boor_surface on identity coefficients, so
+        basis[s, a] is the weight of control point span[s] - a."""
+        spans = np.zeros(res, dtype=np.int32)
+        basis = np.zeros((res, order), dtype=np.float32)
+        L = len(knots)
+        for s in range(res):
+            t = s / (res - 1)
+            if periodic:
+                t = min(max(t, knots[order - 1]), knots[self.num_u + order - 2])
+                d = order - 1
+                for i in range(order - 1, self.num_u + order - 2):
+                    if knots[i] <= t < knots[i + 1]:
+                        d = i
+                if knots[self.num_u + order - 2] <= t:
+                    d = self.num_u + order - 2
+            else:
+                d = min(order - 1 + int(t * (L - 2 * order + 1)), L - order - 1)
+
+            D = np.eye(order, dtype=np.float64)
+            for r in range(order, 1, -1):
+                p = d
+                for k in range(r - 1):
+                    diff = knots[p + r - 1] - knots[p]
+                    omega = (t - knots[p]) / diff if diff > 1e-6 else 0.0
+                    D[k] = omega * D[k] + (1.0 - omega) * D[k + 1]
+                    p -= 1
+            spans[s] = d
+            basis[s] = D[0]
+        return spans, basis
+
     def make_faces_np(self):
-        faces = []
-        if self.is_cylinder:
-            first_range = int(round(((self.order_u - 1) / (self.num_U_knot - 1)) * self.res_u)) - 1
-            last_range = int(round(((self.num_u + self.order_u - 2) / (self.num_U_knot - 1)) * self.res_u))
-            # print(first_range, last_range)
-        else:
-            first_range = 0
-            last_range = self.res_u - 1
-
-        for i in range(first_range, last_range):
-            i_next = (i + 1) % self.res_u
-            for j in range(self.res_v - 1):
-                # Vertex indices in the flattened 1D array
-                v0 = i * self.res_v + j
-                v1 = i_next * self.res_v + j
-                v2 = i_next * self.res_v + (j + 1)
-                v3 = i * self.res_v + (j + 1)
-
-                # Add two triangles per quad
-                faces.append([v0, v1, v2])
-                faces.append([v0, v2, v3])
-
-        self.surface_faces_np = np.array(faces, dtype=np.int32).reshape(-1)  # Flattened
+        self.surface_faces_np = _make_faces(self.res_u, self.res_v, self.is_cylinder,
+                                            self.num_U_knot, self.order_u, self.num_u)
         self.surface_faces_field = ti.field(dtype=ti.i32, shape=len(self.surface_faces_np))
         self.surface_faces_field.from_numpy(self.surface_faces_np)
 
     def evaluate_surface_wrapper(self, control_vertices: np.ndarray):
         self.control_vertices = control_vertices
-        self.reorder_control_net_np()
+        if self.engine == 'numba':
+            self.evaluate_surface_np(control_vertices)
+        else:
+            self.control_vertices_field.from_numpy(
+                np.ascontiguousarray(control_vertices, dtype=np.float32))
+            self.evaluate_surface()
+
+    def evaluate_surface_from_field(self, x_field):
+        # Device-side update path: copies the simulator's position field
+        # directly into the control vertices without a NumPy round-trip.
+        self.copy_control_vertices(x_field)
         self.evaluate_surface()
 
+    @ti.kernel
+    def copy_control_vertices(self, src: ti.template()):
+        for i in range(self.num_control_vertices):
+            self.control_vertices_field[i] = src[i]
+
+    def evaluate_surface_np(self, control_vertices: np.ndarray):
+        # CPU fallback: scatter into grid order host-side, run the numba
+        # (or plain NumPy) De Boor evaluator and upload the result once.
+        # Scatter/output buffers are persistent so the per-frame path does
+        # not allocate.
+        if self._net_buf is None:
+            self._net_buf = np.zeros((self.num_net_rows, self.num_v, 3), dtype=np.float32)
+            self._out_buf = np.empty((self.res_u * self.res_v, 3), dtype=np.float32)
+        net = self._net_buf
+        out = self._out_buf
+        net[self._rows_np, self._cols_np] = control_vertices
+        if self.is_cylinder:
+            net[0] = net[self.num_u - 1]
+            net[self.num_u:] = net[1:self.order_u]
+        if HAS_NUMBA:
+            evaluate_surface_numba(net, self.U_np, self.V_np,
+                                   self.num_u, self.num_v, self.res_u, self.res_v,
+                                   self.order_u, self.order_v, self.is_cylinder, out)
+        else:
+            # Basis weights are static, so the frame is one BLAS-backed
+            # tensor contraction against the dense tables from __init__.
+            np.einsum('ia,jb,abk->ijk', self._Nu_dense, self._Nv_dense, net,
+                      out=out.reshape(self.res_u, self.res_v, 3), optimize=True)
+        if self.dtype == ti.f16:
+            out = out.astype(np.float16)
+        self.surface_points_field.from_numpy(out)
+
     def reset(self):
-        self.evaluate_surface_wrapper(self.control_vertices_init)
+        init = self._init_q8.astype(np.float32) * self._init_scale + self._init_min
+        self.evaluate_surface_wrapper(init)
 
     ###########################################################################
     # Taichi class functions
 
     @ti.kernel
     def evaluate_surface(self):
+        # One launch does reorder + evaluation: consecutive top-level loops
+        # in a Taichi kernel run in order (each internally parallel), so the
+        # sampling loop sees the fully scattered control net.
+
+        # Scatter the raw control vertices into grid order on the device,
+        # flagging the cells whose position actually moved.
+        for i in range(self.num_control_vertices):
+            row = self.net_row_field[i]
+            col = self.net_col_field[i]
+            p = self.control_vertices_field[i]
+            x = ti.cast(p[0], self.dtype)
+            y = ti.cast(p[1], self.dtype)
+            z = ti.cast(p[2], self.dtype)
+            if (ti.abs(x - self.control_net_x[row, col]) > self.dirty_eps or
+                    ti.abs(y - self.control_net_y[row, col]) > self.dirty_eps or
+                    ti.abs(z - self.control_net_z[row, col]) > self.dirty_eps):
+                self.dirty[row, col] = ti.cast(1, ti.u8)
+            self.control_net_x[row, col] = x
+            self.control_net_y[row, col] = y
+            self.control_net_z[row, col] = z
+        if ti.static(self.is_cylinder):
+            # Copy points with u=0 from the points with u=1 (original)
+            for j in range(self.num_v):
+                self.control_net_x[0, j] = self.control_net_x[self.num_u - 1, j]
+                self.control_net_y[0, j] = self.control_net_y[self.num_u - 1, j]
+                self.control_net_z[0, j] = self.control_net_z[self.num_u - 1, j]
+                self.dirty[0, j] = self.dirty[self.num_u - 1, j]
+            # Duplicate the first order_u-1 rows after the seam for periodicity
+            for i, j in ti.ndrange(self.order_u - 1, self.num_v):
+                self.control_net_x[self.num_u + i, j] = self.control_net_x[i + 1, j]
+                self.control_net_y[self.num_u + i, j] = self.control_net_y[i + 1, j]
+                self.control_net_z[self.num_u + i, j] = self.control_net_z[i + 1, j]
+                self.dirty[self.num_u + i, j] = self.dirty[i + 1, j]
+
         for idx in range(self.res_u * self.res_v):
             # Convert flat index to 2D (i,j)
             i = idx // self.res_v
             j = idx % self.res_v
-            # (u, v) in [0, 1]
-            u = ti.cast(i, ti.f32) / ti.cast(self.res_u - 1, ti.f32)
-            v = ti.cast(j, ti.f32) / ti.cast(self.res_v - 1, ti.f32)
-
-            self.surface_points_field[idx] = self.de_boor_surface(u, v)
-            # print(i, j, u, v, idx, self.surface_points_field[idx])
+            d_u = self.span_u[i]
+            d_v = self.span_v[j]
+
+            # Skip the blend entirely when no control point in this sample's
+            # support moved — the stored value is still exact.
+            changed = 0
+            for a in ti.static(range(self.order_u)):
+                for b in ti.static(range(self.order_v)):
+                    changed += ti.cast(self.dirty[d_u - a, d_v - b], ti.i32)
+            if changed > 0:
+                acc = ti.Vector.zero(ti.f32, 3)
+                # order_u/order_v are Python ints: ti.static fully unrolls the
+                # support loops into straight-line code per instance.
+                for a in ti.static(range(self.order_u)):
+                    row_idx = d_u - a
+                    w_u = self.basis_u[i, a]
+                    for b in ti.static(range(self.order_v)):
+                        w = w_u * self.basis_v[j, b]
+                        col_idx = d_v - b
+                        # accumulate in f32 regardless of storage dtype
+                        acc[0] += w * ti.cast(self.control_net_x[row_idx, col_idx], ti.f32)
+                        acc[1] += w * ti.cast(self.control_net_y[row_idx, col_idx], ti.f32)
+                        acc[2] += w * ti.cast(self.control_net_z[row_idx, col_idx], ti.f32)
+                self.surface_points_field[idx] = ti.cast(acc, self.dtype)
+
+        # Clear the dirty flags once every sample has seen them.
+        for row, col in ti.ndrange(self.num_net_rows, self.num_v):
+            self.dirty[row, col] = ti.cast(0, ti.u8)
 
     @ti.func
     def find_knot_index_u(self, u: ti.f32) -> ti.i32:
-        d = self.order_u - 1
-        if u == 0.0:
-            d = self.order_u - 1
-        elif u == 1.0:
-            d = self.num_U_knot - self.order_u
-        else:
-            for i in range(self.order_u, self.num_U_knot - self.order_u):
-                if self.U[i] <= u < self.U[i + 1]:
-                    d = i
-        return d
+        # Clamped-uniform knots make the span index a closed form of u:
+        # interior knots are evenly spaced by 1/(num_U_knot - 2*order_u + 1).
+        d = self.order_u - 1 + ti.cast(u * (self.num_U_knot - 2 * self.order_u + 1), ti.i32)
+        return ti.min(ti.max(d, self.order_u - 1), self.num_U_knot - self.order_u - 1)
 
     @ti.func
     def find_knot_index_u_periodic(self, u: ti.f32) -> ti.i32:
@@ -205,16 +394,8 @@ class BSplineSurface:
 
     @ti.func
     def find_knot_index_v(self, v: ti.f32) -> ti.i32:
-        d = self.order_v - 1
-        if v == 0.0:
-            d = self.order_v - 1
-        elif v == 1.0:
-            d = self.num_V_knot - self.order_v
-        else:
-            for i in range(self.order_v, self.num_V_knot - self.order_v):
-                if self.V[i] <= v < self.V[i + 1]:
-                    d = i
-        return d
+        d = self.order_v - 1 + ti.cast(v * (self.num_V_knot - 2 * self.order_v + 1), ti.i32)
+        return ti.min(ti.max(d, self.order_v - 1), self.num_V_knot - self.order_v - 1)
 
     @ti.func
     def de_boor_surface(self, u: ti.f32, v: ti.f32) -> ti.math.vec3:
@@ -229,29 +410,30 @@ class BSplineSurface:
             d_u = self.find_knot_index_u(u)
         d_v = self.find_knot_index_v(v)
 
-        # Temporary matrix C to hold intermediate results after v-direction
-        C = ti.Matrix.zero(ti.f32, MAX_ORDER, 3)
+        # Temporary matrix C to hold intermediate results after v-direction.
+        # order_u/order_v are plain ints, so the matrices are sized exactly
+        # to the order at compile time instead of a padded MAX_ORDER.
+        C = ti.Matrix.zero(ti.f32, self.order_u, 3)
 
-        for i in range(self.order_u):  # u-direction
+        for i in ti.static(range(self.order_u)):  # u-direction
             row_idx = d_u - i
 
             # D: intermediate control points in v-direction
-            D = ti.Matrix.zero(ti.f32, MAX_ORDER, 3)
-            for j in range(self.order_v):  # v-direction
+            D = ti.Matrix.zero(ti.f32, self.order_v, 3)
+            for j in ti.static(range(self.order_v)):  # v-direction
                 col_idx = d_v - j
-                idx = row_idx * self.num_v + col_idx
-                for k in ti.static(range(3)):
-                    D[j, k] = self.control_net_field[idx][k]
+                D[j, 0] = ti.cast(self.control_net_x[row_idx, col_idx], ti.f32)
+                D[j, 1] = ti.cast(self.control_net_y[row_idx, col_idx], ti.f32)
+                D[j, 2] = ti.cast(self.control_net_z[row_idx, col_idx], ti.f32)
 
             # v-direction de Boor
-            for r_offset in range(self.order_v - 2 + 1):  # r = order_v down to 2
-                r = self.order_v - r_offset
+            for r in ti.static(range(self.order_v, 1, -1)):  # r = order_v down to 2
                 p = d_v
-                for s in range(r - 1):
-                    denom = self.V[p + r - 1] - self.V[p]
-                    omega = (v - self.V[p]) / denom if denom > 1e-6 else 0.0
+                for s in ti.static(range(r - 1)):
+                    omega = (v - self.V[p]) * self.inv_dV[p, r]
+                    # lerp in FMA form: one sub + one fused multiply-add per lane
                     for k in ti.static(range(3)):
-                        D[s, k] = omega * D[s, k] + (1.0 - omega) * D[s + 1, k]
+                        D[s, k] = D[s + 1, k] + omega * (D[s, k] - D[s + 1, k])
                     p -= 1
 
             # Store result of v-direction curve
@@ -259,14 +441,12 @@ class BSplineSurface:
                 C[i, k] = D[0, k]
 
         # u-direction de Boor
-        for r_offset in range(self.order_u - 2 + 1):  # r = order_u down to 2
-            r = self.order_u - r_offset
+        for r in ti.static(range(self.order_u, 1, -1)):  # r = order_u down to 2
             p = d_u
-            for s in range(r - 1):
-                denom = self.U[p + r - 1] - self.U[p]
-                omega = (u - self.U[p]) / denom if denom > 1e-6 else 0.0
+            for s in ti.static(range(r - 1)):
+                omega = (u - self.U[p]) * self.inv_dU[p, r]
                 for k in ti.static(range(3)):
-                    C[s, k] = omega * C[s, k] + (1.0 - omega) * C[s + 1, k]
+                    C[s, k] = C[s + 1, k] + omega * (C[s, k] - C[s + 1, k])
                 p -= 1
 
         return ti.Vector([C[0, k] for k in ti.static(range(3))])
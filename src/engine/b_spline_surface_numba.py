@@ -0,0 +1,86 @@
+import numpy as np
+
+# Numba is optional: when it is installed the evaluator below is JIT-compiled
+# with parallel SIMD loops, otherwise the same code runs as plain Python/NumPy.
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def evaluate_surface_numba(control_net, U, V, num_u, num_v, res_u, res_v,
+                           order_u, order_v, is_cylinder, out):
+    """CPU fallback of the De Boor surface evaluation.
+
+    Direct translation of BSplineSurface.de_boor_surface over the fixed
+    res_u x res_v grid; control_net has shape (num_net_rows, num_v, 3) and
+    out has shape (res_u*res_v, 3). Doubles as a correctness oracle for the
+    Taichi kernel.
+    """
+    num_U_knot = U.shape[0]
+    num_V_knot = V.shape[0]
+    for idx in prange(res_u * res_v):
+        i = idx // res_v
+        j = idx % res_v
+        u = i / (res_u - 1)
+        v = j / (res_v - 1)
+
+        if is_cylinder:
+            u_min = U[order_u - 1]
+            u_max = U[num_u + order_u - 2]
+            u = min(max(u, u_min), u_max)
+            d_u = order_u - 1
+            for k in range(order_u - 1, num_u + order_u - 2):
+                if U[k] <= u < U[k + 1]:
+                    d_u = k
+            if U[num_u + order_u - 2] <= u:
+                d_u = num_u + order_u - 2
+        else:
+            d_u = min(max(order_u - 1 + int(u * (num_U_knot - 2 * order_u + 1)),
+                          order_u - 1), num_U_knot - order_u - 1)
+        d_v = min(max(order_v - 1 + int(v * (num_V_knot - 2 * order_v + 1)),
+                      order_v - 1), num_V_knot - order_v - 1)
+
+        C = np.zeros((order_u, 3), dtype=np.float32)
+        D = np.zeros((order_v, 3), dtype=np.float32)
+        for a in range(order_u):
+            row = d_u - a
+            for b in range(order_v):
+                col = d_v - b
+                for k in range(3):
+                    D[b, k] = control_net[row, col, k]
+
+            for r in range(order_v, 1, -1):
+                p = d_v
+                for s in range(r - 1):
+                    diff = V[p + r - 1] - V[p]
+                    omega = (v - V[p]) / diff if diff > 1e-6 else 0.0
+                    for k in range(3):
+                        D[s, k] = D[s + 1, k] + omega * (D[s, k] - D[s + 1, k])
+                    p -= 1
+
+            for k in range(3):
+                C[a, k] = D[0, k]
+
+        for r in range(order_u, 1, -1):
+            p = d_u
+            for s in range(r - 1):
+                diff = U[p + r - 1] - U[p]
+                omega = (u - U[p]) / diff if diff > 1e-6 else 0.0
+                for k in range(3):
+                    C[s, k] = C[s + 1, k] + omega * (C[s, k] - C[s + 1, k])
+                p -= 1
+
+        for k in range(3):
+            out[idx, k] = C[0, k]
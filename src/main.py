@@ -18,25 +18,43 @@ from src.utils.cylinder_uv_mapping import CylindricalMapping
 from src.engine.b_spline_surface import BSplineSurface
 from src.engine.simulator import ClothSimulator
 
+# Platform never changes at runtime: detect once at import and bake the
+# backend choice into a constant instead of re-walking the decision tree.
+_SYSTEM = platform.system()
+_MACHINE = platform.machine()
+if _SYSTEM == 'Darwin' and _MACHINE != 'x86_64':
+    # Apple Silicon: request the Metal backend, not the arm64 CPU
+    _SELECTED_ARCH = ti.metal
+elif _SYSTEM == 'Darwin':
+    _SELECTED_ARCH = ti.cpu
+else:
+    _SELECTED_ARCH = ti.gpu
+
+# Compiled kernels are cached across runs so only the first launch pays the
+# JIT cost; LRU cleaning with a generous cap keeps the cache from growing
+# unbounded as kernels change during development.
+_CACHE_OPTS = dict(offline_cache=True,
+                   offline_cache_cleaning_policy='lru',
+                   offline_cache_max_size_of_files=1024 * 1024 * 1024)
+
 def init_taichi():
-    system = platform.system()
-    machine = platform.machine()
-    selected_arch = ti.gpu
-    if system == 'Darwin':
-        if machine == 'x86_64':
-            selected_arch = ti.cpu
-        else:
-            selected_arch = ti.arm64
-    elif system in ['Linux', 'Windows']:
-        selected_arch = ti.gpu
-
-    ti.init(arch=selected_arch, default_fp=ti.f32, device_memory_GB=8)
-    print(f"[Taichi Init] System: {system}, "
-          f"Arch: {machine}, "
-          f"Using Taichi arch: {selected_arch}\n")
+    if _SELECTED_ARCH == ti.cpu:
+        ti.init(arch=_SELECTED_ARCH, default_fp=ti.f32, **_CACHE_OPTS)
+    else:
+        # The meshes here need a few MB of fields; a modest fraction of
+        # device memory is plenty and avoids reserving 8 GB up front, which
+        # starves the renderer (and the whole system on unified memory).
+        ti.init(arch=_SELECTED_ARCH, default_fp=ti.f32,
+                device_memory_fraction=0.25, **_CACHE_OPTS)
+    print(f"[Taichi Init] System: {_SYSTEM}, "
+          f"Arch: {_MACHINE}, "
+          f"Using Taichi arch: {_SELECTED_ARCH}\n")
 
 def create_window(window_width: int, window_height: int):
-    window = ti.ui.Window("CPSC 589 Project", (window_width, window_height))
+    # vsync paces the loop to the display refresh in the present call, which
+    # is tighter than the old time.sleep cap (coarse granularity and
+    # over-sleep both dropped frames).
+    window = ti.ui.Window("CPSC 589 Project", (window_width, window_height), vsync=True)
     gui = window.get_gui()
     canvas = window.get_canvas()
     scene = window.get_scene()
@@ -49,41 +67,51 @@ def setup_camera(camera, init_x, init_y, init_z):
     camera.fov(45.0)
 
 @ti.kernel
-def extract_selected_particles(x_cur: ti.template(), selected_indices: ti.template(),
-                               selected_positions: ti.template(), num_vertices: ti.i32):
-    for i in range(num_vertices):
-        if selected_indices[i] == 1:
-            selected_positions[i] = x_cur[i]
-        else:
-            selected_positions[i] = ti.Vector([-10000.0, -10000.0, -10000.0])
+def extract_selected_particles(x_cur: ti.template(), compact_idx: ti.template(),
+                               selected_positions: ti.template(), num_sel: ti.template()):
+    # Gather only the selected positions through the compacted index list;
+    # unselected vertices are never touched (the old version wrote an
+    # off-screen sentinel for all N of them every frame).
+    ti.loop_config(block_dim=256)
+    for k in range(num_sel[None]):
+        selected_positions[k] = x_cur[compact_idx[k]]
 
 @ti.kernel
 def fix_selected_particles(selected: ti.template(), fixed: ti.template(), num_vertices: ti.i32):
+    # Branchless masked clear (selected is {0,1}): every lane does the same
+    # integer multiply, so no divergence on GPU warps. The caller reports
+    # the fixed count once on the host (no device-side print).
+    ti.loop_config(block_dim=128)
     for i in range(num_vertices):
-        if selected[i] == 1:
-            fixed[i] = 0.0
-            print("Vertex ", i, "is fixed")
+        fixed[i] = fixed[i] * ti.cast(1 - selected[i], ti.u8)
 
 @ti.kernel
 def reset_fixed(selected: ti.template(), fixed: ti.template(), num_vertices: ti.i32):
+    ti.loop_config(block_dim=256)
     for i in range(num_vertices):
-        selected[i] = 0.0
-        fixed[i] = 1.0
+        selected[i] = 0
+        fixed[i] = ti.cast(1, ti.u8)
 
 ###############################################################################
 
+# Scene lighting constants hoisted out of the render loop. GGUI consumes the
+# camera/light state on every rendered frame, so the calls themselves must
+# repeat, but the tuples need not be rebuilt per iteration.
+AMBIENT_LIGHT = (0.5, 0.5, 0.5)
+POINT_LIGHT_POS = (10.0, 10.0, 10.0)
+POINT_LIGHT_COLOR = (0.5, 0.5, 0.5)
+
 def main():
     # Initialization
     init_taichi()
 
-    target_fps = 60.0
-    frame_duration = 1.0 / target_fps
-
     window_width, window_height = (800, 600)
     window, gui, canvas, scene, camera = create_window(window_width, window_height)
 
     # Camera setup
-    camera_pos = np.array([-3.0, 3.0, 3.0])
+    # Plain float tuple: the per-drag-frame camera math stays in scalars,
+    # no numpy allocation per event.
+    camera_pos = (-3.0, 3.0, 3.0)
     new_camera_pos = camera_pos
 
     setup_camera(camera, camera_pos[0], camera_pos[1], camera_pos[2])
@@ -91,61 +119,69 @@ def main():
 
     # gui variables
     sim_running = False
-    sim_frame = 0
     stretch_stiffness_gui = 5e5
     substeps_gui = 20
     use_bspline = True
-
-    # Load objects (model, uv_mapper, simulator, etc.)
-    model_8 = OBJLoader("plane_8", rotation_axis=[0,0,1], rotation_degree=90)
-    model_64 = OBJLoader("plane_64", rotation_axis=[0,0,1], rotation_degree=90)
-    skirt = OBJLoader("skirt")
-
-    # model_8
-    uv_mapper_8 = ParametricMapping(model_8.vertices_np)
-    simulator_8 = ClothSimulator(model_8, dt=0.03, stretch_stiffness=5e5, num_substeps=20)
-    b_spline_8 = BSplineSurface(model_8.vertices_np, uv_mapper_8.mapping,
-                                num_u=9, num_v=9, res_u=65, res_v=65, order_u=4, order_v=4)
-    selector_8 = VerticesSelector(window_width, window_height, camera, canvas,
-                                  simulator_8.ti_vertices, simulator_8.num_vertices,
-                                  simulator_8.ti_faces, simulator_8.num_faces)
-    selected_positions_8 = ti.Vector.field(3, dtype=ti.f32, shape=simulator_8.num_vertices)
-
-    # model_64
-    uv_mapper_64 = ParametricMapping(model_64.vertices_np)
-    simulator_64 = ClothSimulator(model_64, dt=0.03, stretch_stiffness=5e5, num_substeps=20)
-    b_spline_64 = BSplineSurface(model_64.vertices_np, uv_mapper_64.mapping,
+    show_wireframe = True
+
+    # Models are built lazily on first use: only the active model's fields
+    # live in Taichi memory at startup, instead of three full simulator +
+    # surface allocations of which two sit idle. Built models stay cached
+    # (Taichi fields cannot be freed individually), so memory grows only
+    # with the models actually visited.
+    model_cache = {}
+
+    def get_model(name):
+        if name in model_cache:
+            return model_cache[name]
+
+        if name == "model_8":
+            loader = OBJLoader("plane_8", rotation_axis=[0,0,1], rotation_degree=90)
+            mapper = ParametricMapping(loader.vertices_np, num_u=9, num_v=9)
+            sim = ClothSimulator(loader, dt=0.03, stretch_stiffness=5e5, num_substeps=20)
+            bsp = BSplineSurface(loader.vertices_np, mapper.mapping,
+                                 num_u=9, num_v=9, res_u=65, res_v=65, order_u=4, order_v=4)
+        elif name == "model_64":
+            loader = OBJLoader("plane_64", rotation_axis=[0,0,1], rotation_degree=90)
+            mapper = ParametricMapping(loader.vertices_np, num_u=65, num_v=65)
+            sim = ClothSimulator(loader, dt=0.03, stretch_stiffness=5e5, num_substeps=20)
+            bsp = BSplineSurface(loader.vertices_np, mapper.mapping,
                                  num_u=65, num_v=65, res_u=100, res_v=100, order_u=4, order_v=4)
-    selector_64 = VerticesSelector(window_width, window_height, camera, canvas,
-                                   simulator_64.ti_vertices, simulator_64.num_vertices,
-                                   simulator_64.ti_faces, simulator_64.num_faces)
-    selected_positions_64 = ti.Vector.field(3, dtype=ti.f32, shape=simulator_64.num_vertices)
-
-    uv_mapper_skirt = CylindricalMapping(skirt.vertices_np)
-    simulator_skirt = ClothSimulator(skirt, dt=0.03, stretch_stiffness=5e5, num_substeps=20)
-    b_spline_skirt = BSplineSurface(skirt.vertices_np, uv_mapper_skirt.mapping,
-                                    num_u=uv_mapper_skirt.num_u, num_v=uv_mapper_skirt.num_v,
-                                    res_u=uv_mapper_skirt.res_u, res_v=uv_mapper_skirt.res_v,
-                                    order_u=4, order_v=4, is_cylinder=True)
-    selector_skirt = VerticesSelector(window_width, window_height, camera, canvas,
-                                      simulator_skirt.ti_vertices, simulator_skirt.num_vertices,
-                                      simulator_skirt.ti_faces, simulator_skirt.num_faces)
-    selected_positions_skirt = ti.Vector.field(3, dtype=ti.f32, shape=simulator_skirt.num_vertices)
+        else:  # skirt
+            loader = OBJLoader("skirt")
+            mapper = CylindricalMapping(loader.vertices_np)
+            sim = ClothSimulator(loader, dt=0.03, stretch_stiffness=5e5, num_substeps=20)
+            bsp = BSplineSurface(loader.vertices_np, mapper.mapping,
+                                 num_u=mapper.num_u, num_v=mapper.num_v,
+                                 res_u=mapper.res_u, res_v=mapper.res_v,
+                                 order_u=4, order_v=4, is_cylinder=True)
+
+        sel = VerticesSelector(window_width, window_height, camera, canvas,
+                               sim.ti_vertices, sim.num_vertices,
+                               sim.ti_faces, sim.num_faces)
+        positions = ti.Vector.field(3, dtype=ti.f32, shape=sim.num_vertices)
+        model_cache[name] = (sim, bsp, sel, positions)
+        return model_cache[name]
 
     # Load Utility objects (camera controller, vertices selector, etc.)
     camera_controller = CameraController()
 
     # init value
-    simulator = simulator_8
-    b_spline = b_spline_8
-    selector = selector_8
-    selected_positions = selected_positions_8
+    simulator, b_spline, selector, selected_positions = get_model("model_8")
+
+    # Cached GUI strings: rebuilt only when the underlying value changes, so
+    # a paused frame allocates no new str/int objects.
+    frame_str_cache = ["# Frame : 0", -1]
+    mesh_str_cache = [None, "", "", ""]
+    # (simulator, stiffness, substeps) last written back: sliders only touch
+    # the simulator when they actually moved or the active model changed.
+    slider_cache = [None, None, None]
 
     def gui_options():
         nonlocal simulator, b_spline, selector, selected_positions
-        nonlocal sim_running, sim_frame
+        nonlocal sim_running
         nonlocal stretch_stiffness_gui, substeps_gui
-        nonlocal use_bspline
+        nonlocal use_bspline, show_wireframe
 
         with gui.sub_window("Options", 0.0, 0.0, 0.3, 0.7) as sub:
             if sub.button("Start/Pause"):
@@ -153,108 +189,118 @@ def main():
 
             if sub.button("Stop"):
                 sim_running = False
-                sim_frame = 0
                 simulator.reset()
                 b_spline.reset()
 
             if sub.button("Use model_8"):
-                current_model = "model_8"
-                simulator = simulator_8
-                b_spline = b_spline_8
-                selector = selector_8
-                selected_positions = selected_positions_8
+                simulator, b_spline, selector, selected_positions = get_model("model_8")
                 sim_running = False
-                sim_frame = 0
                 simulator.reset()
                 b_spline.reset()
 
             if sub.button("Use model_64"):
-                current_model = "model_64"
-                simulator = simulator_64
-                b_spline = b_spline_64
-                selector = selector_64
-                selected_positions = selected_positions_64
+                simulator, b_spline, selector, selected_positions = get_model("model_64")
                 sim_running = False
-                sim_frame = 0
                 simulator.reset()
                 b_spline.reset()
 
             if sub.button("Use skirt"):
-                current_model = "skirt"
-                simulator = simulator_skirt
-                b_spline = b_spline_skirt
-                selector = selector_skirt
-                selected_positions = selected_positions_skirt
+                simulator, b_spline, selector, selected_positions = get_model("skirt")
                 sim_running = False
-                sim_frame = 0
                 simulator.reset()
                 b_spline.reset()
 
             stretch_stiffness_gui = sub.slider_float("Stretch Stiffness", stretch_stiffness_gui, 1e2, 1e6)
             substeps_gui = sub.slider_int("Substeps", substeps_gui, 1, 100)
-            simulator.stretch_stiffness = stretch_stiffness_gui
-            simulator.num_substeps = substeps_gui
+            if (slider_cache[0] is not simulator or
+                    slider_cache[1] != stretch_stiffness_gui or
+                    slider_cache[2] != substeps_gui):
+                simulator.stretch_stiffness = stretch_stiffness_gui
+                simulator.num_substeps = substeps_gui
+                slider_cache[0] = simulator
+                slider_cache[1] = stretch_stiffness_gui
+                slider_cache[2] = substeps_gui
 
             use_bspline = sub.checkbox("Use B-spline Surface", use_bspline)
+            show_wireframe = sub.checkbox("Show Wireframe", show_wireframe)
             simulator.enable_wind = sub.checkbox("Enable Wind", simulator.enable_wind)
 
-            frame_str = "# Frame : " + str(sim_frame)
-            vertices = "# vertices : " + str(simulator.num_vertices)
-            faces = "# faces : " + str(simulator.num_faces)
-            edges = "# edges : " + str(simulator.num_edges)
-            sub.text(frame_str)
-            sub.text(vertices)
-            sub.text(faces)
-            sub.text(edges)
+            if simulator.sim_frame != frame_str_cache[1]:
+                frame_str_cache[0] = f"# Frame : {simulator.sim_frame}"
+                frame_str_cache[1] = simulator.sim_frame
+            if mesh_str_cache[0] is not simulator:
+                mesh_str_cache[0] = simulator
+                mesh_str_cache[1] = f"# vertices : {simulator.num_vertices}"
+                mesh_str_cache[2] = f"# faces : {simulator.num_faces}"
+                mesh_str_cache[3] = f"# edges : {simulator.num_edges}"
+            sub.text(frame_str_cache[0])
+            sub.text(mesh_str_cache[1])
+            sub.text(mesh_str_cache[2])
+            sub.text(mesh_str_cache[3])
+
+    # Redraw the scene only when something can have changed (simulation
+    # running, camera moving, selection dragging, or any input event); a
+    # paused idle frame just re-presents the window.
+    needs_redraw = True
+    # The options sub-window is immediate-mode Python widgets; rebuilding it
+    # at half the render rate halves that interpreter cost and 30 Hz is
+    # plenty for sliders and buttons.
+    gui_interval = 2
+    frame_count = 0
+    camera_dirty = False
 
     while window.running:
-        frame_start = time.time()
-
-        scene.set_camera(camera)
-        scene.ambient_light((0.5, 0.5, 0.5))
-        scene.point_light((10.0, 10.0, 10.0), color=(0.5, 0.5, 0.5))
-        gui_options()
+        if frame_count % gui_interval == 0:
+            gui_options()
+        frame_count += 1
 
         ################################################################################
         # Event handler
+        # Drain every queued event per frame (one poll per frame lets input
+        # back up and adds a frame of latency per queued event).
+
+        # One cursor read per frame shared by every handler below; each call
+        # is a pybind hop and press/drag/release were each making their own.
+        cursor_pos = window.get_cursor_pos()
 
-        if window.get_event(ti.ui.PRESS):
+        while window.get_event(ti.ui.PRESS):
+            needs_redraw = True
             # Vertices selector
             if window.event.key == ti.ui.LMB:
-                cursor_pos = window.get_cursor_pos()
                 selector.on_mouse_press(cursor_pos[0], cursor_pos[1])
                 selector.get_camera_pos(camera_pos[0], camera_pos[1], camera_pos[2])
 
             # Virtual trackball (Rotation)
             elif window.event.key == ti.ui.RMB:
-                cursor_pos = window.get_cursor_pos()
                 camera_controller.on_mouse_press(cursor_pos[0], cursor_pos[1])
 
             # Zoom in
             elif window.event.key == ti.ui.UP:
                 new_camera_pos = camera_controller.zoom(camera_pos, is_zoom_in=True)
                 camera_pos = new_camera_pos
-                camera.position(camera_pos[0], camera_pos[1], camera_pos[2])
-                camera.lookat(0.0, 0.0, 0.0)
+                camera_dirty = True
 
             # Zoom out
             elif window.event.key == ti.ui.DOWN:
                 new_camera_pos = camera_controller.zoom(camera_pos, is_zoom_in=False)
                 camera_pos = new_camera_pos
-                camera.position(camera_pos[0], camera_pos[1], camera_pos[2])
-                camera.lookat(0.0, 0.0, 0.0)
+                camera_dirty = True
 
             elif window.event.key == 'f':
-                if selector.selected_indices is not None:
+                if selector.num_selected > 0:
                     fix_selected_particles(selector.selected_indices, simulator.fixed, simulator.num_vertices)
+                    simulator.wake()
+                    print(f"[Selector] Fixed {selector.num_selected} selected vertices")
 
             elif window.event.key == 'r':
                 reset_fixed(selector.selected_indices, simulator.fixed, simulator.num_vertices)
+                selector.clear_selection()
+                simulator.wake()
 
-        if window.get_event(ti.ui.RELEASE):
+        while window.get_event(ti.ui.RELEASE):
+            needs_redraw = True
             # Vertices selector
             if window.event.key == ti.ui.LMB:
-                cursor_pos = window.get_cursor_pos()
                 selector.on_mouse_release(cursor_pos[0], cursor_pos[1])
 
             # Virtual trackball (Rotation)
@@ -263,27 +309,32 @@ def main():
                 camera_pos = new_camera_pos
 
         if camera_controller.is_mouse_down:
-            cursor_pos = window.get_cursor_pos()
             new_quat = camera_controller.on_mouse_drag(cursor_pos[0], cursor_pos[1])
-            rot_mat = new_quat.rotation_matrix
 
-            new_camera_pos = rot_mat @ camera_pos
+            new_camera_pos = CameraController.rotate_point(
+                new_quat, camera_pos[0], camera_pos[1], camera_pos[2])
+            camera_dirty = True
+            # Do not renew the camera position. Because it will be accumulated!
+
+        # One camera update per frame after all input is aggregated: zoom and
+        # drag may both fire, and each position/lookat call crosses into C++.
+        if camera_dirty:
             camera.position(new_camera_pos[0], new_camera_pos[1], new_camera_pos[2])
             camera.lookat(0.0, 0.0, 0.0)
-            # Do not renew the camera position. Because it will be accumulated!
+            camera_dirty = False
 
         ################################################################################
         # Simulator
         # record_num_frames = 1000
         # frame_times = []
-        if sim_running:
+        if sim_running and not (simulator.at_rest and not simulator.enable_wind):
             # start_time = time.time()
 
             simulator.step()
             # simulator.xpbd_solver.record_residual()
-            x_cur_np = simulator.x_cur.to_numpy()
-            b_spline.evaluate_surface_wrapper(x_cur_np)
-            sim_frame += 1
+            # Field-to-field update; keeps positions on the device instead of
+            # round-tripping through NumPy every frame.
+            b_spline.evaluate_surface_from_field(simulator.x_cur)
 
             # end_time = time.time()
             # frame_times.append(end_time - start_time)
@@ -297,31 +348,44 @@ def main():
 
         ################################################################################
         # Canvas Renderer
-        if selector.selected_indices is not None:
-            extract_selected_particles(simulator.x_cur, selector.selected_indices, selected_positions,
-                                       simulator.num_vertices)
-            scene.particles(selected_positions, radius=0.01, color=(0.0, 0.0, 1.0))
-
-        if use_bspline:
-            scene.mesh(b_spline.surface_points_field, indices=b_spline.surface_faces_field, color=(1.0, 1.0, 0.0))
-        else:
-            scene.mesh(simulator.x_cur, indices=simulator.ti_faces_flatten, color=(1.0, 1.0, 0.0))
-        scene.mesh(simulator.x_cur, indices=simulator.ti_faces_flatten, color=(0.0, 0.0, 0.0), show_wireframe=True)
-
-        # Draw a selection square
-        if selector.is_dragging:
-            cursor_pos = window.get_cursor_pos()
-            selector.on_mouse_drag(cursor_pos[0], cursor_pos[1])
-            selector.get_rect_lines()
-
-        canvas.scene(scene)
+        dirty = (sim_running or camera_controller.is_mouse_down or
+                 selector.is_dragging or needs_redraw)
+        needs_redraw = False
+
+        if dirty:
+            scene.set_camera(camera)
+            scene.ambient_light(AMBIENT_LIGHT)
+            scene.point_light(POINT_LIGHT_POS, color=POINT_LIGHT_COLOR)
+
+            if selector.num_selected > 0:
+                # Re-gather only when the selection set changed or the
+                # simulation moved the vertices; a paused camera orbit
+                # re-draws the previous gather untouched.
+                if selector.selection_dirty or sim_running:
+                    extract_selected_particles(simulator.x_render, selector.compact_idx, selected_positions,
+                                               selector.num_sel)
+                    selector.selection_dirty = False
+                scene.particles(selected_positions, radius=0.01, color=(0.0, 0.0, 1.0),
+                                index_count=selector.num_selected)
+
+            if use_bspline:
+                scene.mesh(b_spline.surface_points_field, indices=b_spline.surface_faces_field, color=(1.0, 1.0, 0.0))
+            else:
+                scene.mesh(simulator.x_render, indices=simulator.ti_faces_flatten, color=(1.0, 1.0, 0.0))
+            # Wireframe overlay as a line draw over the unique edges — half
+            # the segments (and no second vertex-shading pass over faces)
+            # compared to re-submitting the mesh with show_wireframe. It is
+            # a debug aid, so it can be switched off to save the draw.
+            if show_wireframe:
+                scene.lines(simulator.x_render, width=1.0, indices=simulator.ti_edges_flatten, color=(0.0, 0.0, 0.0))
+
+            # Draw a selection square
+            if selector.is_dragging:
+                selector.on_mouse_drag(cursor_pos[0], cursor_pos[1])
+                selector.get_rect_lines()
+
+            canvas.scene(scene)
         window.show()
 
-        frame_end = time.time()
-        elapsed_time = frame_end - frame_start
-        sleep_time = frame_duration - elapsed_time
-        if sleep_time > 0:
-            time.sleep(sleep_time)
-
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,5 +1,4 @@
-import numpy as np
-from pyquaternion import Quaternion
+import math
 
 class CameraController:
     def __init__(self,
@@ -7,22 +6,23 @@ class CameraController:
                  max_dist: float = 20.0,
                  min_dist: float = 2.0):
         self.radius = 1.0
-        self.current_quat = Quaternion()
+        # Quaternion kept as a plain (w, x, y, z) tuple: the drag path runs
+        # every mouse-move frame on the UI thread, so it stays in scalar math
+        # with no pyquaternion or numpy allocations.
+        self.current_quat = (1.0, 0.0, 0.0, 0.0)
         self.max_dist = max_dist
         self.min_dist = min_dist
         self.last_pos = None
         self.is_mouse_down = False
 
-    def map_to_sphere(self, x: float, y: float) -> np.ndarray:
+    def map_to_sphere(self, x: float, y: float):
         # normalize (x,y) coord from [0,1] to [-1,1]
         x_norm = 2.0 * x - 1.0
         y_norm = 2.0 * y - 1.0
-        d = np.sqrt(x_norm ** 2 + y_norm ** 2)
-        if d < self.radius:
-            z = np.sqrt(self.radius ** 2 - d ** 2)
-        else:
-            z = 0.0
-        return np.array([x_norm, y_norm, z], dtype=np.float32)
+        d2 = x_norm * x_norm + y_norm * y_norm
+        r2 = self.radius * self.radius
+        z = math.sqrt(r2 - d2) if d2 < r2 else 0.0
+        return (x_norm, y_norm, z)
 
     def on_mouse_press(self, x: float, y: float):
         self.is_mouse_down = True
@@ -31,9 +31,9 @@ class CameraController:
     def on_mouse_release(self):
         self.is_mouse_down = False
         self.last_pos = None
-        self.current_quat = Quaternion()
+        self.current_quat = (1.0, 0.0, 0.0, 0.0)
 
-    def on_mouse_drag(self, x: float, y: float) -> Quaternion:
+    def on_mouse_drag(self, x: float, y: float):
         if not self.is_mouse_down:
             return self.current_quat
 
@@ -43,35 +43,55 @@ class CameraController:
             return self.current_quat
 
         # Calculate rotation axis using the cross product
-        axis = np.cross(current_pos, self.last_pos)
-        axis_norm = np.linalg.norm(axis)
+        cx, cy, cz = current_pos
+        lx, ly, lz = self.last_pos
+        ax = cy * lz - cz * ly
+        ay = cz * lx - cx * lz
+        az = cx * ly - cy * lx
+        axis_norm = math.sqrt(ax * ax + ay * ay + az * az)
         if axis_norm > 1e-6:
-            axis /= axis_norm
+            ax, ay, az = ax / axis_norm, ay / axis_norm, az / axis_norm
         else:
-            axis = np.array([0.0, 0.0, 1.0], dtype=np.float32)
+            ax, ay, az = 0.0, 0.0, 1.0
 
-        # Calculate rotation angle using the dot product
-        dot_val = np.dot(self.last_pos, current_pos)
-        dot_val = np.clip(dot_val, -1.0, 1.0)  # Ensure numerical stability
-        angle = np.arccos(dot_val)
+        # Half angle from atan2(|cross|, dot): no clamp needed, and it stays
+        # well-conditioned near parallel vectors where acos(dot) loses
+        # precision (dot -> 1 flattens while |cross| is still ~angle).
+        dot_val = lx * cx + ly * cy + lz * cz
+        half = 0.5 * math.atan2(axis_norm, dot_val)
 
-        # Create a quaternion representing the incremental rotation
-        delta_quat = Quaternion(axis=axis, angle=angle)
-        self.current_quat = delta_quat * self.current_quat
+        # Compose the incremental rotation: current_quat = delta * current_quat
+        dw, s = math.cos(half), math.sin(half)
+        dx, dy, dz = ax * s, ay * s, az * s
+        qw, qx, qy, qz = self.current_quat
+        self.current_quat = (dw * qw - dx * qx - dy * qy - dz * qz,
+                             dw * qx + dx * qw + dy * qz - dz * qy,
+                             dw * qy - dx * qz + dy * qw + dz * qx,
+                             dw * qz + dx * qy - dy * qx + dz * qw)
         self.last_pos = current_pos
         return self.current_quat
 
-    def zoom(self, current_camera_pos: np.ndarray, is_zoom_in: bool):
-        if is_zoom_in:
-            new_camera_pos = current_camera_pos / 1.1
-            new_norm = np.linalg.norm(new_camera_pos)
-            if new_norm < self.min_dist:
-                new_camera_pos = (new_camera_pos / new_norm) * self.min_dist
-
-        else:
-            new_camera_pos = current_camera_pos * 1.1
-            new_norm = np.linalg.norm(new_camera_pos)
-            if new_norm > self.max_dist:
-                new_camera_pos = (new_camera_pos / new_norm) * self.max_dist
+    @staticmethod
+    def rotate_point(quat, x: float, y: float, z: float):
+        # Scalar q*p*q.conj(); avoids building the 3x3 rotation matrix and a
+        # numpy matmul per drag frame (p' = p + 2*qv x (qv x p + w*p)).
+        qw, qx, qy, qz = quat
+        tx = qy * z - qz * y + qw * x
+        ty = qz * x - qx * z + qw * y
+        tz = qx * y - qy * x + qw * z
+        return (x + 2.0 * (qy * tz - qz * ty),
+                y + 2.0 * (qz * tx - qx * tz),
+                z + 2.0 * (qx * ty - qy * tx))
 
-        return new_camera_pos
+    def zoom(self, current_camera_pos, is_zoom_in: bool):
+        x, y, z = current_camera_pos
+        scale = (1.0 / 1.1) if is_zoom_in else 1.1
+        x, y, z = x * scale, y * scale, z * scale
+        norm = math.sqrt(x * x + y * y + z * z)
+        if is_zoom_in and norm < self.min_dist:
+            scale = self.min_dist / norm
+            x, y, z = x * scale, y * scale, z * scale
+        elif not is_zoom_in and norm > self.max_dist:
+            scale = self.max_dist / norm
+            x, y, z = x * scale, y * scale, z * scale
+        return (x, y, z)
@@ -13,19 +13,13 @@ class CylindricalMapping:
         y_min = np.min(self.control_vertices[:, 1])
         y_max = np.max(self.control_vertices[:, 1])
         y_range = y_max - y_min if y_max != y_min else 1.0
-        mapping = []
-        for i in range(len(self.control_vertices)):
-            x, y, z = self.control_vertices[i]
-            theta = np.arctan2(z, x)  # [-pi, pi]
-            u_val = (theta + np.pi) / (2 * np.pi)  # Normalize to [0, 1]
-            v_val = (y - y_min) / y_range
-            mapping.append([u_val, v_val])
-            # print(i, u_val, v_val)
-        return np.array(mapping)
+        theta = np.arctan2(self.control_vertices[:, 2], self.control_vertices[:, 0])  # [-pi, pi]
+        u_val = (theta + np.pi) / (2 * np.pi)  # Normalize to [0, 1]
+        v_val = (self.control_vertices[:, 1] - y_min) / y_range
+        return np.column_stack((u_val, v_val))
 
     def compute_grid_shape(self):
-        u_values = self.mapping[:, 0]
-        v_values = self.mapping[:, 1]
-        unique_u = np.unique(np.round(u_values, decimals=3))
-        unique_v = np.unique(np.round(v_values, decimals=3))
-        return unique_u.shape[0], unique_v.shape[0]
\ No newline at end of file
+        # Round both columns into integer bins in one pass; counting unique
+        # integers is cheaper than sorting freshly rounded float arrays.
+        bins = np.rint(self.mapping * 1000.0).astype(np.int32)
+        return np.unique(bins[:, 0]).size, np.unique(bins[:, 1]).size
\ No newline at end of file
@@ -1,7 +1,8 @@
 import numpy as np
 
 class ParametricMapping:
-    def __init__(self, control_vertices: np.ndarray):
+    def __init__(self, control_vertices: np.ndarray,
+                 num_u: int = None, num_v: int = None):
         self.control_vertices = control_vertices
 
         self.x_min = np.min(control_vertices[:, 0])
@@ -10,24 +11,29 @@ class ParametricMapping:
         self.z_max = np.max(control_vertices[:, 2])
 
         self.mapping = self.compute_uv_mapping()
-        self.num_u, self.num_v = self.compute_grid_shape()
+        # Callers that know their grid topology pass it in and skip the
+        # O(N log N) unique-based rediscovery below.
+        if num_u is not None and num_v is not None:
+            self.num_u, self.num_v = num_u, num_v
+        else:
+            self.num_u, self.num_v = self.compute_grid_shape()
 
     def compute_uv_mapping(self):
-        mapping = []
-        for i, vtx in enumerate(self.control_vertices):
-            x, z = vtx[0], vtx[2]
-            u_val = (x - self.x_min) / (self.x_max - self.x_min) if self.x_max != self.x_min else 0.0
-            v_val = (z - self.z_min) / (self.z_max - self.z_min) if self.z_max != self.z_min else 0.0
-            mapping.append([u_val, v_val])
-        mapping_np = np.array(mapping)
-        return mapping_np
+        # Whole-array normalization instead of a per-vertex Python loop with
+        # list appends; degenerate (flat) axes map to 0 like before.
+        dx = self.x_max - self.x_min
+        dz = self.z_max - self.z_min
+        u_val = ((self.control_vertices[:, 0] - self.x_min) / dx
+                 if dx != 0.0 else np.zeros(self.control_vertices.shape[0]))
+        v_val = ((self.control_vertices[:, 2] - self.z_min) / dz
+                 if dz != 0.0 else np.zeros(self.control_vertices.shape[0]))
+        return np.column_stack((u_val, v_val))
 
     def compute_grid_shape(self):
-        u_values = self.mapping[:, 0]
-        v_values = self.mapping[:, 1]
-        unique_u = np.unique(u_values)
-        unique_v = np.unique(v_values)
-        num_u = unique_u.shape[0]
-        num_v = unique_v.shape[0]
+        # Quantize before deduplicating so float jitter from the
+        # normalization can't split one grid line into several values.
+        keys = np.round(self.mapping * (1 << 20)).astype(np.int64)
+        num_u = np.unique(keys[:, 0]).shape[0]
+        num_v = np.unique(keys[:, 1]).shape[0]
 
         return num_u, num_v
\ No newline at end of file
@@ -2,22 +2,29 @@ import numpy as np
 import matplotlib.pyplot as plt
 import os
 
-current_dir = os.getcwd()
-results_dir = os.path.abspath(os.path.join(current_dir, "../..", "results"))
-file_model_8 = os.path.join(results_dir, "residual_history_plane_8.npy")
-file_model_64 = os.path.join(results_dir, "residual_history_plane_64.npy")
+if __name__ == "__main__":
+    current_dir = os.getcwd()
+    results_dir = os.path.abspath(os.path.join(current_dir, "../..", "results"))
+    file_model_8 = os.path.join(results_dir, "residual_history_plane_8.npy")
+    file_model_64 = os.path.join(results_dir, "residual_history_plane_64.npy")
 
-residuals_8 = np.load(file_model_8)
-residuals_64 = np.load(file_model_64)
+    # mmap keeps long histories off the heap; matplotlib can only show a
+    # couple thousand distinct points anyway, so long series are subsampled.
+    residuals_8 = np.load(file_model_8, mmap_mode='r')
+    residuals_64 = np.load(file_model_64, mmap_mode='r')
+    step_8 = max(1, len(residuals_8) // 2000)
+    step_64 = max(1, len(residuals_64) // 2000)
 
-plt.figure(figsize=(7, 5))
-plt.plot(residuals_8, label="model_8 + B-spline", linestyle="--", linewidth=2)
-plt.plot(residuals_64, label="model_64 (Full XPBD)", linestyle="-", linewidth=2)
-plt.yscale("log")
-plt.xlabel("Frame")
-plt.ylabel("Constraint Residual Energy")
-plt.title("Constraint Convergence Comparison")
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+    plt.figure(figsize=(7, 5))
+    plt.plot(np.arange(0, len(residuals_8), step_8), residuals_8[::step_8],
+             label="model_8 + B-spline", linestyle="--", linewidth=2)
+    plt.plot(np.arange(0, len(residuals_64), step_64), residuals_64[::step_64],
+             label="model_64 (Full XPBD)", linestyle="-", linewidth=2)
+    plt.yscale("log")
+    plt.xlabel("Frame")
+    plt.ylabel("Constraint Residual Energy")
+    plt.title("Constraint Convergence Comparison")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
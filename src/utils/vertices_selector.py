@@ -1,6 +1,5 @@
 import numpy as np
 import taichi as ti
-from taichi.examples.rendering.oit_renderer import camera_pos
 
 
 @ti.data_oriented
@@ -31,9 +30,56 @@ class VerticesSelector:
         self.selected_indices = ti.field(dtype=ti.i32, shape=self.num_vertices)
         self.selected_indices.fill(0)
 
-        # for drawing a selection rectangular
+        # Compact list of the selected vertex indices, rebuilt only when the
+        # selection changes: rendering then gathers num_selected positions
+        # instead of writing a sentinel for every unselected vertex.
+        self.compact_idx = ti.field(dtype=ti.i32, shape=self.num_vertices)
+        self.num_sel = ti.field(dtype=ti.i32, shape=())
+
+        # Vertices that pass the cheap rectangle test, compacted before the
+        # expensive occlusion pass: a drag usually covers a small fraction
+        # of the mesh, so only those candidates pay for the O(faces)
+        # ray-triangle loop (and the occlusion kernel has no divergent
+        # in-rect branch).
+        self.candidates = ti.field(dtype=ti.i32, shape=self.num_vertices)
+        self.num_candidates = ti.field(dtype=ti.i32, shape=())
+
+        # SoA copy of the face indices for the occlusion loop: with the
+        # interleaved Vector.field each face fetch strides 12 bytes, while
+        # three scalar fields keep the index reads contiguous per cache
+        # line. Split once here; the topology never changes.
+        self.face_i0 = ti.field(dtype=ti.i32, shape=self.num_faces)
+        self.face_i1 = ti.field(dtype=ti.i32, shape=self.num_faces)
+        self.face_i2 = ti.field(dtype=ti.i32, shape=self.num_faces)
+        self.split_faces_kernel()
+
+        # Per-face ray-test geometry (origin vertex and the two edge
+        # vectors), rebuilt once per drag release: every candidate vertex
+        # tests against every face, so hoisting the p1-p0 / p2-p0
+        # subtractions out of that O(candidates x faces) loop pays for the
+        # single O(faces) precompute immediately.
+        self.face_p0 = ti.Vector.field(3, dtype=ti.f32, shape=self.num_faces)
+        self.face_edge1 = ti.Vector.field(3, dtype=ti.f32, shape=self.num_faces)
+        self.face_edge2 = ti.Vector.field(3, dtype=ti.f32, shape=self.num_faces)
+
+        # Persistent device-side copies of the view-projection matrix and
+        # camera position, written once per drag release instead of
+        # rebuilding a ti.Matrix/ti.Vector argument element by element on
+        # every call.
+        self.transform_field = ti.Matrix.field(4, 4, dtype=ti.f32, shape=())
+        self.cam_pos_field = ti.Vector.field(3, dtype=ti.f32, shape=())
+        self.num_selected = 0  # host mirror, avoids a device read per frame
+        # Set whenever the selection set changes; the render loop only
+        # re-gathers positions when this is set or the simulation moved them.
+        self.selection_dirty = False
+
+        # for drawing a selection rectangular; the line topology never
+        # changes, so the indices are uploaded once here and only the four
+        # corner vertices are rewritten (on device) while dragging.
         self.ti_rect_vertices = ti.Vector.field(2, dtype=ti.f32, shape=4)
         self.ti_rect_indices = ti.Vector.field(2, dtype=ti.i32, shape=4)
+        self.ti_rect_indices.from_numpy(
+            np.array([[0, 1], [1, 2], [2, 3], [3, 0]], dtype=np.int32))
 
     def get_camera_pos(self, x, y, z):
         self.camera_pos = np.array([x, y, z])
@@ -61,16 +107,8 @@ class VerticesSelector:
         y_min = min(self.drag_start[1], self.drag_end[1])
         y_max = max(self.drag_start[1], self.drag_end[1])
 
-        vertices_np = np.array([
-            [x_min, y_min],
-            [x_min, y_max],
-            [x_max, y_max],
-            [x_max, y_min],
-        ], dtype=np.float32)
-        indices_np = np.array([[0, 1], [1, 2], [2, 3], [3, 0]], dtype=np.int32)
-
-        self.ti_rect_vertices.from_numpy(vertices_np)
-        self.ti_rect_indices.from_numpy(indices_np)
+        self.update_rect_kernel(float(x_min), float(y_min),
+                                float(x_max), float(y_max))
         self.canvas.lines(vertices=self.ti_rect_vertices, indices=self.ti_rect_indices,
                           width=0.002, color=(0.0, 0.0, 1.0))
 
@@ -84,23 +122,72 @@ class VerticesSelector:
         proj_matrix = self.camera.get_projection_matrix(aspect=self.aspect).T
         view_matrix = self.camera.get_view_matrix().T
         transform = proj_matrix @ view_matrix
-        transform_ti = ti.Matrix([[ti.cast(transform[i, j], ti.f32) for j in range(4)] for i in range(4)])
+        self.transform_field[None] = transform.astype(np.float32)
+        self.cam_pos_field.from_numpy(self.camera_pos.astype(np.float32))
+
+        self.cull_candidates_kernel(self.ti_vertices,
+                                    float(x_min), float(y_min),
+                                    float(x_max), float(y_max))
+        self.precompute_face_edges_kernel(self.ti_vertices)
+        self.occlusion_kernel(self.ti_vertices)
+        self.compact_selection()
+
+    def compact_selection(self):
+        self.compact_selection_kernel()
+        self.num_selected = int(self.num_sel[None])
+        self.selection_dirty = True
+
+    def clear_selection(self):
+        self.selected_indices.fill(0)
+        self.num_sel[None] = 0
+        self.num_selected = 0
+        self.selection_dirty = True
+
+    @ti.kernel
+    def split_faces_kernel(self):
+        for j in range(self.num_faces):
+            f = self.ti_faces[j]
+            self.face_i0[j] = f[0]
+            self.face_i1[j] = f[1]
+            self.face_i2[j] = f[2]
 
-        self.compute_selection_kernel(self.ti_vertices, transform_ti,
-                                      float(x_min), float(y_min),
-                                      float(x_max), float(y_max),
-                                      float(self.window_width), float(self.window_height),
-                                      ti.Vector(self.camera_pos.tolist()))
+    @ti.kernel
+    def precompute_face_edges_kernel(self, vertices: ti.template()):
+        for j in range(self.num_faces):
+            p0 = vertices[self.face_i0[j]]
+            self.face_p0[j] = p0
+            self.face_edge1[j] = vertices[self.face_i1[j]] - p0
+            self.face_edge2[j] = vertices[self.face_i2[j]] - p0
+
+    @ti.kernel
+    def update_rect_kernel(self, x_min: ti.f32, y_min: ti.f32,
+                           x_max: ti.f32, y_max: ti.f32):
+        self.ti_rect_vertices[0] = ti.Vector([x_min, y_min])
+        self.ti_rect_vertices[1] = ti.Vector([x_min, y_max])
+        self.ti_rect_vertices[2] = ti.Vector([x_max, y_max])
+        self.ti_rect_vertices[3] = ti.Vector([x_max, y_min])
 
     @ti.kernel
-    def compute_selection_kernel(self,
-                                 vertices: ti.template(),
-                                 transform: ti.template(),
-                                 x_min: ti.f32, y_min: ti.f32,
-                                 x_max: ti.f32, y_max: ti.f32,
-                                 win_width: ti.f32, win_height: ti.f32,
-                                 cam_pos: ti.template()):
+    def compact_selection_kernel(self):
+        self.num_sel[None] = 0
         for i in range(self.num_vertices):
+            if self.selected_indices[i] == 1:
+                k = ti.atomic_add(self.num_sel[None], 1)
+                self.compact_idx[k] = i
+
+    @ti.kernel
+    def cull_candidates_kernel(self,
+                               vertices: ti.template(),
+                               x_min: ti.f32, y_min: ti.f32,
+                               x_max: ti.f32, y_max: ti.f32):
+        self.num_candidates[None] = 0
+        transform = self.transform_field[None]
+        for i in range(self.num_vertices):
+            # Clear the previous drag's selection in the same pass — this
+            # loop already touches every vertex, so no separate fill(0)
+            # launch is needed and the buffer is written only once.
+            self.selected_indices[i] = 0
+
             # world coord -> 4D homogeneous vector
             v_world = ti.Vector([vertices[i][0], vertices[i][1], vertices[i][2], 1.0])
             clip = transform @ v_world  # clip space coord
@@ -113,44 +200,54 @@ class VerticesSelector:
             screen_y = (ndc[1] + 1.0) / 2.0
 
             if x_min <= screen_x <= x_max and y_min <= screen_y <= y_max:
-                ray_o = cam_pos
-                ray_d = (vertices[i] - ray_o).normalized()
-                dist_to_vertex = (vertices[i] - ray_o).norm()
-                visible = True
-
-                for j in range(self.ti_faces.shape[0]):
-                    f = self.ti_faces[j]
-                    if f[0] == i or f[1] == i or f[2] == i:
-                        continue
-                    p0 = vertices[f[0]]
-                    p1 = vertices[f[1]]
-                    p2 = vertices[f[2]]
-
-                    # Ray-triangle intersection
-                    eps = 1e-4
-                    edge1 = p1 - p0
-                    edge2 = p2 - p0
-                    h = ray_d.cross(edge2)
-                    a = edge1.dot(h)
-
-                    if abs(a) < eps:
-                        continue
-
-                    f_inv = 1.0 / a
-                    s = ray_o - p0
-                    u = f_inv * s.dot(h)
-                    if u < 0.0 or u > 1.0:
-                        continue
-
-                    q = s.cross(edge1)
-                    v = f_inv * ray_d.dot(q)
-                    if v < 0.0 or u + v > 1.0:
-                        continue
-
-                    t = f_inv * edge2.dot(q)
-                    if eps < t < dist_to_vertex:
-                        visible = False
-                        break
-
-                if visible:
-                    self.selected_indices[i] = 1
\ No newline at end of file
+                idx = ti.atomic_add(self.num_candidates[None], 1)
+                self.candidates[idx] = i
+
+    @ti.kernel
+    def occlusion_kernel(self, vertices: ti.template()):
+        # Only the compacted in-rect candidates run the O(faces) visibility
+        # test; every thread here does the same work.
+        cam_pos = self.cam_pos_field[None]
+        for k in range(self.num_candidates[None]):
+            i = self.candidates[k]
+            ray_o = cam_pos
+            ray_d = (vertices[i] - ray_o).normalized()
+            dist_to_vertex = (vertices[i] - ray_o).norm()
+            visible = True
+
+            for j in range(self.num_faces):
+                i0 = self.face_i0[j]
+                i1 = self.face_i1[j]
+                i2 = self.face_i2[j]
+                if i0 == i or i1 == i or i2 == i:
+                    continue
+                p0 = self.face_p0[j]
+                edge1 = self.face_edge1[j]
+                edge2 = self.face_edge2[j]
+
+                # Ray-triangle intersection
+                eps = 1e-4
+                h = ray_d.cross(edge2)
+                a = edge1.dot(h)
+
+                if abs(a) < eps:
+                    continue
+
+                f_inv = 1.0 / a
+                s = ray_o - p0
+                u = f_inv * s.dot(h)
+                if u < 0.0 or u > 1.0:
+                    continue
+
+                q = s.cross(edge1)
+                v = f_inv * ray_d.dot(q)
+                if v < 0.0 or u + v > 1.0:
+                    continue
+
+                t = f_inv * edge2.dot(q)
+                if eps < t < dist_to_vertex:
+                    visible = False
+                    break
+
+            if visible:
+                self.selected_indices[i] = 1
\ No newline at end of file